@@ -11,20 +11,320 @@ NOTE: This file is shared between bazos-scraper and gfr-scraper.
 
 from __future__ import annotations
 
-import json
+import functools
+import io
+import re
+import random
+import struct
 import asyncio
-from typing import Any, Dict, List, Optional
-from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from datetime import datetime, timedelta, timezone
+import orjson
 import psycopg2
-from psycopg2.extras import RealDictCursor, execute_values
-from psycopg2.pool import SimpleConnectionPool
-from contextlib import contextmanager
+import psycopg2.extensions
+from psycopg2.extras import execute_values
+from psycopg2.pool import ThreadedConnectionPool
 import time
+from weakref import WeakKeyDictionary
 
 import os
 from apify import Actor
 
 
+# Per-row listing columns; actor_run_id and scraper_name are the same for the
+# whole batch and are sent once per statement instead of once per row
+_LISTING_ROW_COLUMNS = """
+    id, title, url, category,
+    price, price_text, description, full_description, location,
+    views, date, is_top, image_url, contact_name, phone,
+    coordinates_lat, coordinates_lng, images, similar_listings,
+    scraped_at
+"""
+
+_LISTING_COLUMNS = "actor_run_id, scraper_name, " + _LISTING_ROW_COLUMNS
+
+_LISTING_CONFLICT_UPDATE = """
+    ON CONFLICT (id, actor_run_id, scraper_name) DO UPDATE SET
+        title = EXCLUDED.title,
+        url = EXCLUDED.url,
+        category = EXCLUDED.category,
+        price = EXCLUDED.price,
+        price_text = EXCLUDED.price_text,
+        description = EXCLUDED.description,
+        full_description = EXCLUDED.full_description,
+        location = EXCLUDED.location,
+        views = EXCLUDED.views,
+        date = EXCLUDED.date,
+        is_top = EXCLUDED.is_top,
+        image_url = EXCLUDED.image_url,
+        contact_name = EXCLUDED.contact_name,
+        phone = EXCLUDED.phone,
+        coordinates_lat = EXCLUDED.coordinates_lat,
+        coordinates_lng = EXCLUDED.coordinates_lng,
+        images = EXCLUDED.images,
+        similar_listings = EXCLUDED.similar_listings,
+        scraped_at = EXCLUDED.scraped_at
+"""
+
+# Explicit casts so the VALUES list resolves to the listings column types even
+# when a column is NULL in every row of a page
+_LISTING_VALUES_TEMPLATE = """(
+    %s, %s, %s, %s,
+    %s::integer, %s, %s, %s, %s,
+    %s::integer, %s, %s::boolean, %s, %s, %s,
+    %s::numeric, %s::numeric, %s::jsonb, %s::jsonb,
+    %s::timestamptz
+)"""
+
+_SQL_UPSERT_ACTOR_RUN = """
+    INSERT INTO actor_runs (
+        run_id, start_time, categories, max_listings,
+        search_query, location_filter, price_min, price_max,
+        status, scraper_id
+    ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+    ON CONFLICT (run_id) DO UPDATE SET
+        start_time = EXCLUDED.start_time,
+        categories = EXCLUDED.categories,
+        max_listings = EXCLUDED.max_listings,
+        search_query = EXCLUDED.search_query,
+        location_filter = EXCLUDED.location_filter,
+        price_min = EXCLUDED.price_min,
+        price_max = EXCLUDED.price_max,
+        status = 'running'
+    RETURNING id, scraper_id
+"""
+
+_SQL_UPDATE_ACTOR_RUN_STATUS = """
+    UPDATE actor_runs
+    SET status = %s,
+        total_listings_scraped = %s,
+        end_time = %s
+    WHERE id = %s
+"""
+
+# {constants} receives the escaped actor_run_id and scraper_name literals;
+# execute_values fills the single VALUES %s placeholder
+_SQL_INSERT_LISTINGS_VALUES = f"""
+    INSERT INTO listings ({_LISTING_COLUMNS})
+    SELECT {{constants}}, {_LISTING_ROW_COLUMNS}
+    FROM (VALUES %s) AS v ({_LISTING_ROW_COLUMNS})
+    {_LISTING_CONFLICT_UPDATE}
+"""
+
+# Coordinates are staged as float8 so they can be sent in binary without
+# encoding PostgreSQL's numeric format; the upsert casts them back
+_SQL_CREATE_LISTINGS_STAGE = """
+    CREATE TEMP TABLE listings_stage ON COMMIT DROP AS
+    SELECT
+        id, title, url, category,
+        price, price_text, description, full_description, location,
+        views, date, is_top, image_url, contact_name, phone,
+        coordinates_lat::float8 AS coordinates_lat,
+        coordinates_lng::float8 AS coordinates_lng,
+        images, similar_listings,
+        scraped_at
+    FROM listings WITH NO DATA
+"""
+
+_SQL_COPY_LISTINGS_STAGE = f"COPY listings_stage ({_LISTING_ROW_COLUMNS}) FROM STDIN WITH (FORMAT binary)"
+
+_SQL_INSERT_LISTINGS_FROM_STAGE = f"""
+    INSERT INTO listings ({_LISTING_COLUMNS})
+    SELECT %s, %s, {_LISTING_ROW_COLUMNS} FROM listings_stage
+    {_LISTING_CONFLICT_UPDATE}
+"""
+
+_SQL_LISTINGS_BY_RUN = """
+    SELECT l.*, ar.run_id, ar.start_time as actor_run_start
+    FROM listings l
+    JOIN actor_runs ar ON l.actor_run_id = ar.id
+    WHERE ar.run_id = %s
+    ORDER BY l.scraped_at DESC
+"""
+
+_SQL_LISTINGS_BY_RUN_AND_SCRAPER = """
+    SELECT l.*, ar.run_id, ar.start_time as actor_run_start
+    FROM listings l
+    JOIN actor_runs ar ON l.actor_run_id = ar.id
+    WHERE ar.run_id = %s AND l.scraper_name = %s
+    ORDER BY l.scraped_at DESC
+"""
+
+_SQL_SCRAPER_STATS_ALL = """
+    SELECT * FROM scraper_stats
+    ORDER BY total_listings DESC
+"""
+
+_SQL_SCRAPER_STATS_BY_NAME = """
+    SELECT * FROM scraper_stats
+    WHERE scraper_name = %s
+"""
+
+# Read queries executed through per-connection prepared statements:
+# name -> (parameter types, query using $n placeholders)
+_PREPARED_QUERIES = {
+    'latest_by_category_scraper': ('text, text, integer', """
+        SELECT * FROM latest_listings
+        WHERE category = $1 AND scraper_name = $2
+        ORDER BY scraped_at DESC
+        LIMIT $3
+    """),
+    'latest_by_category': ('text, integer', """
+        SELECT * FROM latest_listings
+        WHERE category = $1
+        ORDER BY scraped_at DESC
+        LIMIT $2
+    """),
+    'latest_by_scraper': ('text, integer', """
+        SELECT * FROM latest_listings
+        WHERE scraper_name = $1
+        ORDER BY scraped_at DESC
+        LIMIT $2
+    """),
+    'latest_all': ('integer', """
+        SELECT * FROM latest_listings
+        ORDER BY scraped_at DESC
+        LIMIT $1
+    """),
+    'run_stats_by_run': ('text', """
+        SELECT * FROM actor_run_stats
+        WHERE run_id = $1
+    """),
+    'run_stats_recent': ('', """
+        SELECT * FROM actor_run_stats
+        ORDER BY start_time DESC
+        LIMIT 10
+    """),
+}
+
+_PLACEHOLDER_RE = re.compile(r'\$\d+')
+
+
+_INT4 = struct.Struct('!i')
+_INT8 = struct.Struct('!q')
+_FLOAT8 = struct.Struct('!d')
+_PG_EPOCH = datetime(2000, 1, 1, tzinfo=timezone.utc)
+
+
+def _pack_timestamptz(value: datetime) -> bytes:
+    # Microseconds since 2000-01-01 UTC; values are made tz-aware before staging
+    return _INT8.pack((value - _PG_EPOCH) // timedelta(microseconds=1))
+
+
+@functools.lru_cache(maxsize=None)
+def _listing_binary_encoders(encoding: str) -> tuple:
+    """Binary COPY encoders for each of _LISTING_ROW_COLUMNS, matching the column
+    types of the listings_stage table.
+
+    The server reads binary text and jsonb values in the connection's
+    client_encoding, so strings are encoded with ``encoding`` rather than UTF-8.
+    """
+    def text(v):
+        return str(v).encode(encoding)
+
+    def jsonb(v):
+        # jsonb binary format version 1, followed by the JSON text
+        return b'\x01' + v.encode(encoding)
+
+    return (
+        text,                                    # id
+        text,                                    # title
+        text,                                    # url
+        text,                                    # category
+        lambda v: _INT4.pack(int(v)),            # price
+        text,                                    # price_text
+        text,                                    # description
+        text,                                    # full_description
+        text,                                    # location
+        lambda v: _INT4.pack(int(v)),            # views
+        text,                                    # date
+        lambda v: b'\x01' if v else b'\x00',     # is_top
+        text,                                    # image_url
+        text,                                    # contact_name
+        text,                                    # phone
+        lambda v: _FLOAT8.pack(float(v)),        # coordinates_lat
+        lambda v: _FLOAT8.pack(float(v)),        # coordinates_lng
+        jsonb,                                   # images
+        jsonb,                                   # similar_listings
+        _pack_timestamptz,                       # scraped_at
+    )
+
+
+def _copy_binary(rows: List[tuple], encoding: str = 'utf-8') -> io.BytesIO:
+    """Encode rows as a PostgreSQL binary COPY stream, text in the given Python codec."""
+    encoders = _listing_binary_encoders(encoding)
+    buffer = io.BytesIO()
+    write = buffer.write
+    write(b'PGCOPY\n\xff\r\n\x00' + _INT4.pack(0) + _INT4.pack(0))
+    field_count = struct.pack('!h', len(encoders))
+    null_field = _INT4.pack(-1)
+    for row in rows:
+        write(field_count)
+        for encode, value in zip(encoders, row):
+            if value is None:
+                write(null_field)
+            else:
+                data = encode(value)
+                write(_INT4.pack(len(data)))
+                write(data)
+    write(struct.pack('!h', -1))
+    buffer.seek(0)
+    return buffer
+
+
+# Errors caused by the values of individual rows (out of range numbers, too long
+# strings, constraint violations, unencodable values); anything else affects every row
+_ROW_ERRORS = (psycopg2.DataError, psycopg2.IntegrityError, struct.error, ValueError)
+
+
+def _aware(value: datetime) -> datetime:
+    """Attach the local timezone to naive datetimes produced by datetime.now()."""
+    return value if value.tzinfo else value.astimezone()
+
+
+class _ConnectionContext:
+    """Checks a pooled connection out on enter and returns it on exit.
+
+    A plain class instead of @contextmanager so each checkout skips the
+    generator frame and the exception re-throw into it.
+    """
+
+    __slots__ = ('manager', 'conn')
+
+    def __init__(self, manager: "DatabaseManager"):
+        self.manager = manager
+        self.conn = None
+
+    def __enter__(self):
+        try:
+            self.conn = self.manager._get_healthy_connection()
+        except Exception as e:
+            Actor.log.error(f"Database connection error: {e}")
+            raise
+        return self.conn
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        conn = self.conn
+        self.conn = None
+        broken = False
+        # GeneratorExit and cancellation are normal early exits, not connection errors;
+        # the pool rolls back any open transaction when the connection is returned
+        if exc_type is not None and issubclass(exc_type, Exception):
+            broken = issubclass(exc_type, (psycopg2.OperationalError, psycopg2.InterfaceError))
+            if not broken:
+                try:
+                    conn.rollback()
+                except Exception:
+                    broken = True
+            Actor.log.error(f"Database connection error: {exc}")
+        try:
+            self.manager.connection_pool.putconn(conn, close=broken)
+        except Exception as e:
+            Actor.log.warning(f"Failed to return connection to pool: {e}")
+            conn.close()
+        return False
+
+
 class DatabaseManager:
     """Manages PostgreSQL database connections and operations."""
 
@@ -35,6 +335,18 @@ class DatabaseManager:
         self.actor_run_start = None
         self.scraper_name = scraper_name
         self.scraper_id = None  # Set from SCRAPER_ID env var (links to scrapers table)
+        self.copy_threshold = 500
+        self.insert_page_size = 500
+        self.use_pgbouncer = False
+        self.flush_threshold = 1000
+        self.flush_interval = 0.0
+        # Names of the statements already prepared on each connection
+        self._prepared: WeakKeyDictionary = WeakKeyDictionary()
+        # Write-behind buffer: listings accepted by insert_listings() but not yet written
+        self._pending: List[Dict[str, Any]] = []
+        self._pending_lock = asyncio.Lock()
+        self._flush_task: Optional[asyncio.Task] = None
+        self._stop_flushing = asyncio.Event()
 
     def initialize_pool(self):
         """Initialize the database connection pool using environment variables."""
@@ -48,7 +360,7 @@ class DatabaseManager:
                 'sslmode': os.environ.get('DB_SSL_MODE') or 'prefer',
                 'connect_timeout': 30,
                 'application_name': self.scraper_name,
-                'keepalives_idle': 600,
+                'keepalives_idle': 120,
                 'keepalives_interval': 30,
                 'keepalives_count': 3
             }
@@ -62,8 +374,16 @@ class DatabaseManager:
                 except ValueError:
                     Actor.log.warning(f"Invalid SCRAPER_ID env var: {scraper_id_str}")
 
+            self.copy_threshold = int(os.environ.get('DB_COPY_THRESHOLD') or '500')
+            self.insert_page_size = int(os.environ.get('DB_INSERT_PAGE_SIZE') or '500')
+            self.flush_threshold = int(os.environ.get('DB_FLUSH_THRESHOLD') or '1000')
+            self.flush_interval = float(os.environ.get('DB_FLUSH_INTERVAL') or '0')
+            # Behind PgBouncer in transaction mode the bouncer owns server
+            # connections, so session state and pool resets are avoided
+            self.use_pgbouncer = os.environ.get('DB_USE_PGBOUNCER', '').lower() in ('1', 'true', 'yes')
+
             pool_size = int(os.environ.get('DB_POOL_SIZE') or '5')
-            self.connection_pool = SimpleConnectionPool(
+            self.connection_pool = ThreadedConnectionPool(
                 minconn=1,
                 maxconn=pool_size,
                 **db_config
@@ -71,6 +391,8 @@ class DatabaseManager:
 
             Actor.log.info("Database connection pool initialized successfully")
             Actor.log.info(f"Connected to database: {db_config['host']}:{db_config['port']}/{db_config['database']}")
+            if self.use_pgbouncer:
+                Actor.log.info("DB_USE_PGBOUNCER set: relying on the external pooler for reconnects")
 
         except Exception as e:
             Actor.log.error(f"Failed to initialize database connection pool: {e}")
@@ -82,83 +404,57 @@ class DatabaseManager:
         self.actor_run_start = start_time
         Actor.log.info(f"Set actor run info: {run_uuid} started at {start_time}")
 
-    def _is_connection_alive(self, conn) -> bool:
-        """Check if a database connection is still alive."""
-        try:
-            with conn.cursor() as cursor:
-                cursor.execute("SELECT 1")
-                cursor.fetchone()
-            return True
-        except (psycopg2.OperationalError, psycopg2.InterfaceError):
-            return False
-
     def _get_healthy_connection(self, max_retries: int = 3):
-        """Get a healthy database connection with retry logic."""
+        """Check out a connection from the pool with retry logic.
+
+        No liveness query is sent: TCP keepalives detect dead peers while idle,
+        and a connection that fails during real traffic is discarded by
+        get_connection() and retried by _execute_with_retry().
+        """
         for attempt in range(max_retries):
             try:
                 conn = self.connection_pool.getconn()
-                if self._is_connection_alive(conn):
-                    return conn
-                else:
-                    try:
-                        conn.close()
-                    except:
-                        pass
-                    Actor.log.warning(f"Connection was dead, attempting to get new connection (attempt {attempt + 1})")
             except Exception as e:
                 Actor.log.warning(f"Failed to get connection (attempt {attempt + 1}): {e}")
                 if attempt < max_retries - 1:
                     time.sleep(1)
-                else:
-                    raise
+                    continue
+                raise
+
+            # libpq already knows about connections it saw close; drop those for free
+            if not conn.closed:
+                return conn
+            self.connection_pool.putconn(conn, close=True)
+            Actor.log.warning(f"Connection was closed, attempting to get new connection (attempt {attempt + 1})")
 
         raise Exception(f"Failed to get healthy connection after {max_retries} attempts")
 
-    @contextmanager
-    def get_connection(self):
-        """Get a healthy database connection from the pool with retry logic."""
+    def get_connection(self) -> "_ConnectionContext":
+        """Get a database connection from the pool, discarding it if it breaks."""
         if not self.connection_pool:
             self.initialize_pool()
+        return _ConnectionContext(self)
 
-        conn = None
-        try:
-            conn = self._get_healthy_connection()
-            yield conn
-        except Exception as e:
-            if conn:
-                try:
-                    conn.rollback()
-                except:
-                    pass
-            Actor.log.error(f"Database connection error: {e}")
-            raise
-        finally:
-            if conn:
-                try:
-                    self.connection_pool.putconn(conn)
-                except Exception as e:
-                    Actor.log.warning(f"Failed to return connection to pool: {e}")
-                    try:
-                        conn.close()
-                    except:
-                        pass
+    async def _execute_with_retry(self, operation_func, max_retries: int = 3):
+        """Execute a blocking database operation in a worker thread with automatic retry logic.
 
-    def _execute_with_retry(self, operation_func, max_retries: int = 3):
-        """Execute a database operation with automatic retry logic."""
+        Backoff sleeps are awaited with jitter so the event loop keeps running
+        and concurrent retries do not reconnect in lockstep.
+        """
         for attempt in range(max_retries):
             try:
-                return operation_func()
+                return await asyncio.to_thread(operation_func)
             except (psycopg2.OperationalError, psycopg2.InterfaceError) as e:
                 Actor.log.warning(f"Database operation failed (attempt {attempt + 1}): {e}")
                 if attempt < max_retries - 1:
-                    time.sleep(2 ** attempt)
-                    if attempt == 1:
+                    await asyncio.sleep(min(2 ** attempt + random.uniform(0, 0.5), 10))
+                    if attempt == 1 and not self.use_pgbouncer:
                         Actor.log.info("Reinitializing connection pool due to persistent connection issues")
                         try:
                             self.close_pool()
                         except:
                             pass
-                        self.initialize_pool()
+                        await asyncio.to_thread(self.initialize_pool)
                 else:
                     Actor.log.error(f"Database operation failed after {max_retries} attempts")
                     raise
@@ -184,23 +480,7 @@ class DatabaseManager:
         with self.get_connection() as conn:
             with conn.cursor() as cursor:
                 # Upsert: insert new record or update existing one (e.g. pre-created by scheduler)
-                cursor.execute("""
-                    INSERT INTO actor_runs (
-                        run_id, start_time, categories, max_listings,
-                        search_query, location_filter, price_min, price_max,
-                        status, scraper_id
-                    ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-                    ON CONFLICT (run_id) DO UPDATE SET
-                        start_time = EXCLUDED.start_time,
-                        categories = EXCLUDED.categories,
-                        max_listings = EXCLUDED.max_listings,
-                        search_query = EXCLUDED.search_query,
-                        location_filter = EXCLUDED.location_filter,
-                        price_min = EXCLUDED.price_min,
-                        price_max = EXCLUDED.price_max,
-                        status = 'running'
-                    RETURNING id, scraper_id
-                """, (
+                cursor.execute(_SQL_UPSERT_ACTOR_RUN, (
                     self.actor_run_uuid,
                     self.actor_run_start,
                     categories,
@@ -213,28 +493,21 @@ class DatabaseManager:
                     self.scraper_id
                 ))
 
-                row = cursor.fetchone()
-                self.actor_run_id = row[0]
+                self.actor_run_id, existing_scraper_id = cursor.fetchone()
                 # Inherit scraper_id from pre-created record if we don't have one
-                if not self.scraper_id and row[1]:
-                    self.scraper_id = row[1]
+                if not self.scraper_id and existing_scraper_id:
+                    self.scraper_id = existing_scraper_id
                 conn.commit()
                 Actor.log.info(f"Actor run record ready with ID: {self.actor_run_id}")
                 return self.actor_run_id
 
-    def update_actor_run_status(self, status: str, total_listings: int = 0):
+    async def update_actor_run_status(self, status: str, total_listings: int = 0):
         """Update actor run status and total listings count with retry logic."""
 
         def _update_operation():
             with self.get_connection() as conn:
                 with conn.cursor() as cursor:
-                    cursor.execute("""
-                        UPDATE actor_runs
-                        SET status = %s,
-                            total_listings_scraped = %s,
-                            end_time = %s
-                        WHERE id = %s
-                    """, (
+                    cursor.execute(_SQL_UPDATE_ACTOR_RUN_STATUS, (
                         status,
                         total_listings,
                         datetime.now(),
@@ -243,39 +516,119 @@ class DatabaseManager:
                     conn.commit()
                     Actor.log.info(f"Updated actor run status: {status} with {total_listings} listings")
 
-        self._execute_with_retry(_update_operation)
+        await self._execute_with_retry(_update_operation)
 
-    def insert_listings(self, listings: List[Dict[str, Any]]):
-        """Insert multiple listings into the database with retry logic."""
+    @staticmethod
+    def _coordinate(listing: Dict[str, Any], key: str, flat_key: str) -> Optional[float]:
+        """Resolve a coordinate from the nested dict, falling back to the flat field."""
+        coords = listing.get('coordinates')
+        value = coords.get(key) if coords else None
+        return listing.get(flat_key) if value is None else value
 
-        if not listings:
-            return
+    async def insert_listings(
+        self,
+        listings: List[Dict[str, Any]],
+        final_status: Optional[Tuple[str, int]] = None
+    ):
+        """Queue listings for insertion, flushing once DB_FLUSH_THRESHOLD rows are pending.
+
+        Small batches are coalesced in memory across categories and written
+        together when the threshold is reached or on close(), and additionally
+        every DB_FLUSH_INTERVAL seconds when that is set.
+        When ``final_status`` is given as ``(status, total_listings)``, everything
+        pending is flushed immediately and the actor run is finalized in the
+        same transaction.
+        """
 
         if not self.actor_run_id:
             raise ValueError("Actor run ID not set. Call create_actor_run() first.")
 
+        self._pending.extend(listings)
+        if self.flush_interval > 0 and (self._flush_task is None or self._flush_task.done()):
+            self._flush_task = asyncio.create_task(self._flush_periodically())
+
+        if final_status or len(self._pending) >= self.flush_threshold:
+            await self.flush(final_status)
+
+    async def flush(self, final_status: Optional[Tuple[str, int]] = None):
+        """Write all pending listings in one batch.
+
+        If some rows are rejected for their values, the batch is split up so only
+        the offending rows are dropped. On any other error, or cancellation, the
+        rows are put back at the front of the buffer and ``final_status`` is not
+        written, so a later flush retries them instead of losing them
+        (rewriting already stored rows is a harmless upsert).
+        """
+        async with self._pending_lock:
+            listings, self._pending = self._pending, []
+            try:
+                if listings:
+                    try:
+                        await self._write_listings(listings, final_status)
+                    except _ROW_ERRORS as e:
+                        Actor.log.warning(f"Batch of {len(listings)} listings was rejected ({e}), retrying in smaller batches")
+                        middle = len(listings) // 2
+                        await self._write_around_bad_rows(listings[:middle])
+                        await self._write_around_bad_rows(listings[middle:])
+                        if final_status:
+                            await self.update_actor_run_status(*final_status)
+                elif final_status:
+                    await self.update_actor_run_status(*final_status)
+            except BaseException:
+                self._pending[:0] = listings
+                raise
+
+    async def _write_around_bad_rows(self, listings: List[Dict[str, Any]]):
+        """Write listings, bisecting failed batches until the rejected rows are isolated and dropped."""
+        if not listings:
+            return
+        try:
+            await self._write_listings(listings)
+        except _ROW_ERRORS as e:
+            if len(listings) == 1:
+                Actor.log.error(f"Dropping listing {listings[0].get('id')} rejected by the database: {e}")
+                return
+            middle = len(listings) // 2
+            await self._write_around_bad_rows(listings[:middle])
+            await self._write_around_bad_rows(listings[middle:])
+
+    async def _flush_periodically(self):
+        """Flush the write-behind buffer every DB_FLUSH_INTERVAL seconds until close()."""
+        while True:
+            try:
+                await asyncio.wait_for(self._stop_flushing.wait(), self.flush_interval)
+                return
+            except asyncio.TimeoutError:
+                pass
+            if not self._pending:
+                continue
+            try:
+                await self.flush()
+            except Exception as e:
+                Actor.log.error(f"Periodic flush of {len(self._pending)} pending listings failed: {e}")
+
+    async def _write_listings(
+        self,
+        listings: List[Dict[str, Any]],
+        final_status: Optional[Tuple[str, int]] = None
+    ):
+        """Insert multiple listings into the database with retry logic.
+
+        When ``final_status`` is given as ``(status, total_listings)``, the
+        actor run is finalized in the same transaction as this batch, saving
+        the separate update_actor_run_status() round trip.
+        """
+
+        # A row may only be upserted once per statement, so buffered duplicates
+        # collapse to the most recently scraped version of each listing
+        listings = list({listing.get('id', ''): listing for listing in listings}.values())
+
         def _insert_operation():
-            listing_data = []
-            for listing in listings:
-                coords_lat = None
-                coords_lng = None
-                if 'coordinates' in listing and listing['coordinates']:
-                    coords_lat = listing['coordinates'].get('latitude')
-                    coords_lng = listing['coordinates'].get('longitude')
-
-                # Also check top-level coordinate fields
-                if coords_lat is None:
-                    coords_lat = listing.get('coordinates_lat')
-                if coords_lng is None:
-                    coords_lng = listing.get('coordinates_lng')
-
-                images_json = json.dumps(listing.get('images', [])) if listing.get('images') else None
-                similar_json = json.dumps(listing.get('similar_listings', [])) if listing.get('similar_listings') else None
-
-                listing_data.append((
+            now = datetime.now().astimezone()
+            dumps = orjson.dumps
+            listing_data = [
+                (
                     listing.get('id', ''),
-                    self.actor_run_id,
-                    self.scraper_name,
                     listing.get('title', ''),
                     listing.get('url', ''),
                     listing.get('category', ''),
@@ -290,154 +643,157 @@ class DatabaseManager:
                     listing.get('image_url', ''),
                     listing.get('contact_name', ''),
                     listing.get('phone', ''),
-                    coords_lat,
-                    coords_lng,
-                    images_json,
-                    similar_json,
-                    datetime.fromisoformat(listing.get('scraped_at', datetime.now().isoformat()))
-                ))
-
+                    self._coordinate(listing, 'latitude', 'coordinates_lat'),
+                    self._coordinate(listing, 'longitude', 'coordinates_lng'),
+                    dumps(listing['images']).decode() if listing.get('images') else None,
+                    dumps(listing['similar_listings']).decode() if listing.get('similar_listings') else None,
+                    _aware(datetime.fromisoformat(listing['scraped_at'])) if listing.get('scraped_at') else now
+                )
+                for listing in listings
+            ]
+
+            started = time.perf_counter()
             with self.get_connection() as conn:
                 with conn.cursor() as cursor:
-                    execute_values(
-                        cursor,
-                        """
-                        INSERT INTO listings (
-                            id, actor_run_id, scraper_name, title, url, category,
-                            price, price_text, description, full_description, location,
-                            views, date, is_top, image_url, contact_name, phone,
-                            coordinates_lat, coordinates_lng, images, similar_listings,
-                            scraped_at
-                        ) VALUES %s
-                        ON CONFLICT (id, actor_run_id, scraper_name) DO UPDATE SET
-                            title = EXCLUDED.title,
-                            url = EXCLUDED.url,
-                            category = EXCLUDED.category,
-                            price = EXCLUDED.price,
-                            price_text = EXCLUDED.price_text,
-                            description = EXCLUDED.description,
-                            full_description = EXCLUDED.full_description,
-                            location = EXCLUDED.location,
-                            views = EXCLUDED.views,
-                            date = EXCLUDED.date,
-                            is_top = EXCLUDED.is_top,
-                            image_url = EXCLUDED.image_url,
-                            contact_name = EXCLUDED.contact_name,
-                            phone = EXCLUDED.phone,
-                            coordinates_lat = EXCLUDED.coordinates_lat,
-                            coordinates_lng = EXCLUDED.coordinates_lng,
-                            images = EXCLUDED.images,
-                            similar_listings = EXCLUDED.similar_listings,
-                            scraped_at = EXCLUDED.scraped_at
-                        """,
-                        listing_data,
-                        template=None,
-                        page_size=100
-                    )
+                    use_copy = len(listing_data) >= self.copy_threshold
+                    if use_copy:
+                        self._copy_listings(cursor, listing_data)
+                    else:
+                        # execute_values only splices the VALUES placeholder, so the
+                        # batch constants are inlined as escaped literals
+                        constants = cursor.mogrify("%s, %s", (self.actor_run_id, self.scraper_name))
+                        constants = constants.decode(psycopg2.extensions.encodings[conn.encoding])
+                        execute_values(
+                            cursor,
+                            _SQL_INSERT_LISTINGS_VALUES.format(constants=constants.replace('%', '%%')),
+                            listing_data,
+                            template=_LISTING_VALUES_TEMPLATE,
+                            page_size=self.insert_page_size
+                        )
+                    if final_status:
+                        status, total_listings = final_status
+                        cursor.execute(_SQL_UPDATE_ACTOR_RUN_STATUS, (
+                            status,
+                            total_listings,
+                            datetime.now(),
+                            self.actor_run_id
+                        ))
                     conn.commit()
+                    elapsed_ms = (time.perf_counter() - started) * 1000
+                    method = 'COPY' if use_copy else f"execute_values (page_size={self.insert_page_size})"
+                    Actor.log.debug(f"Insert batch: {len(listing_data)} rows via {method} in {elapsed_ms:.1f} ms")
                     Actor.log.info(f"Inserted {len(listings)} listings into database")
+                    if final_status:
+                        Actor.log.info(f"Updated actor run status: {final_status[0]} with {final_status[1]} listings")
+
+        await self._execute_with_retry(_insert_operation)
+
+    def _copy_listings(self, cursor, listing_data: List[tuple]):
+        """Bulk load rows through binary COPY into a temp staging table, then upsert them."""
+        cursor.execute(_SQL_CREATE_LISTINGS_STAGE)
+        encoding = psycopg2.extensions.encodings[cursor.connection.encoding]
+        cursor.copy_expert(_SQL_COPY_LISTINGS_STAGE, _copy_binary(listing_data, encoding))
+        cursor.execute(_SQL_INSERT_LISTINGS_FROM_STAGE, (self.actor_run_id, self.scraper_name))
+
+    @staticmethod
+    def _fetch_dicts(cursor) -> List[Dict[str, Any]]:
+        """Fetch all remaining rows as dicts keyed by column name."""
+        columns = [column.name for column in cursor.description]
+        return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+    def _execute_prepared(self, cursor, name: str, params: tuple = ()):
+        """Execute a named read query, preparing it once per connection.
+
+        Behind PgBouncer in transaction mode a session-level PREPARE may land
+        on a different server connection, so the query is sent as-is instead.
+        """
+        param_types, query = _PREPARED_QUERIES[name]
+        if self.use_pgbouncer:
+            cursor.execute(_PLACEHOLDER_RE.sub('%s', query), params or None)
+            return
+
+        prepared = self._prepared.setdefault(cursor.connection, set())
+        if name not in prepared:
+            signature = f" ({param_types})" if param_types else ""
+            cursor.execute(f"PREPARE {name}{signature} AS {query}")
+            prepared.add(name)
 
-        self._execute_with_retry(_insert_operation)
+        if params:
+            cursor.execute(f"EXECUTE {name} ({', '.join(['%s'] * len(params))})", params)
+        else:
+            cursor.execute(f"EXECUTE {name}")
 
     def get_latest_listings(self, category: Optional[str] = None, scraper_name: Optional[str] = None, limit: int = 100) -> List[Dict[str, Any]]:
         """Get the latest listings from the database."""
 
         with self.get_connection() as conn:
-            with conn.cursor(cursor_factory=RealDictCursor) as cursor:
+            with conn.cursor() as cursor:
                 if category and scraper_name:
-                    cursor.execute("""
-                        SELECT * FROM latest_listings
-                        WHERE category = %s AND scraper_name = %s
-                        ORDER BY scraped_at DESC
-                        LIMIT %s
-                    """, (category, scraper_name, limit))
+                    self._execute_prepared(cursor, 'latest_by_category_scraper', (category, scraper_name, limit))
                 elif category:
-                    cursor.execute("""
-                        SELECT * FROM latest_listings
-                        WHERE category = %s
-                        ORDER BY scraped_at DESC
-                        LIMIT %s
-                    """, (category, limit))
+                    self._execute_prepared(cursor, 'latest_by_category', (category, limit))
                 elif scraper_name:
-                    cursor.execute("""
-                        SELECT * FROM latest_listings
-                        WHERE scraper_name = %s
-                        ORDER BY scraped_at DESC
-                        LIMIT %s
-                    """, (scraper_name, limit))
+                    self._execute_prepared(cursor, 'latest_by_scraper', (scraper_name, limit))
                 else:
-                    cursor.execute("""
-                        SELECT * FROM latest_listings
-                        ORDER BY scraped_at DESC
-                        LIMIT %s
-                    """, (limit,))
+                    self._execute_prepared(cursor, 'latest_all', (limit,))
 
-                results = cursor.fetchall()
-                return [dict(row) for row in results]
+                return self._fetch_dicts(cursor)
 
     def get_actor_run_stats(self, run_uuid: Optional[str] = None) -> List[Dict[str, Any]]:
         """Get statistics for actor runs."""
 
         with self.get_connection() as conn:
-            with conn.cursor(cursor_factory=RealDictCursor) as cursor:
+            with conn.cursor() as cursor:
                 if run_uuid:
-                    cursor.execute("""
-                        SELECT * FROM actor_run_stats
-                        WHERE run_id = %s
-                    """, (run_uuid,))
+                    self._execute_prepared(cursor, 'run_stats_by_run', (run_uuid,))
                 else:
-                    cursor.execute("""
-                        SELECT * FROM actor_run_stats
-                        ORDER BY start_time DESC
-                        LIMIT 10
-                    """)
+                    self._execute_prepared(cursor, 'run_stats_recent')
 
-                results = cursor.fetchall()
-                return [dict(row) for row in results]
+                return self._fetch_dicts(cursor)
 
     def get_listings_by_actor_run(self, run_uuid: str, scraper_name: Optional[str] = None) -> List[Dict[str, Any]]:
         """Get all listings for a specific actor run."""
+        return list(self.iter_listings_by_actor_run(run_uuid, scraper_name))
+
+    def iter_listings_by_actor_run(
+        self,
+        run_uuid: str,
+        scraper_name: Optional[str] = None,
+        itersize: int = 2000
+    ) -> Iterator[Dict[str, Any]]:
+        """Stream listings for a specific actor run through a server-side cursor.
+
+        Rows are fetched from the server in chunks of ``itersize``, so memory
+        stays bounded regardless of how many listings the run produced. The
+        connection is held until the generator is exhausted or closed.
+        """
 
         with self.get_connection() as conn:
-            with conn.cursor(cursor_factory=RealDictCursor) as cursor:
+            with conn.cursor(name='listings_by_actor_run') as cursor:
+                cursor.itersize = itersize
                 if scraper_name:
-                    cursor.execute("""
-                        SELECT l.*, ar.run_id, ar.start_time as actor_run_start
-                        FROM listings l
-                        JOIN actor_runs ar ON l.actor_run_id = ar.id
-                        WHERE ar.run_id = %s AND l.scraper_name = %s
-                        ORDER BY l.scraped_at DESC
-                    """, (run_uuid, scraper_name))
+                    cursor.execute(_SQL_LISTINGS_BY_RUN_AND_SCRAPER, (run_uuid, scraper_name))
                 else:
-                    cursor.execute("""
-                        SELECT l.*, ar.run_id, ar.start_time as actor_run_start
-                        FROM listings l
-                        JOIN actor_runs ar ON l.actor_run_id = ar.id
-                        WHERE ar.run_id = %s
-                        ORDER BY l.scraped_at DESC
-                    """, (run_uuid,))
+                    cursor.execute(_SQL_LISTINGS_BY_RUN, (run_uuid,))
 
-                results = cursor.fetchall()
-                return [dict(row) for row in results]
+                # Named cursors only expose a description after the first FETCH
+                columns = None
+                for row in cursor:
+                    if columns is None:
+                        columns = [column.name for column in cursor.description]
+                    yield dict(zip(columns, row))
 
     def get_scraper_stats(self, scraper_name: Optional[str] = None) -> List[Dict[str, Any]]:
         """Get statistics for scrapers."""
 
         with self.get_connection() as conn:
-            with conn.cursor(cursor_factory=RealDictCursor) as cursor:
+            with conn.cursor() as cursor:
                 if scraper_name:
-                    cursor.execute("""
-                        SELECT * FROM scraper_stats
-                        WHERE scraper_name = %s
-                    """, (scraper_name,))
+                    cursor.execute(_SQL_SCRAPER_STATS_BY_NAME, (scraper_name,))
                 else:
-                    cursor.execute("""
-                        SELECT * FROM scraper_stats
-                        ORDER BY total_listings DESC
-                    """)
+                    cursor.execute(_SQL_SCRAPER_STATS_ALL)
 
-                results = cursor.fetchall()
-                return [dict(row) for row in results]
+                return self._fetch_dicts(cursor)
 
     def refresh_pool(self):
         """Refresh the connection pool by closing and reinitializing it."""
@@ -451,12 +807,29 @@ class DatabaseManager:
             Actor.log.error(f"Failed to refresh connection pool: {e}")
             raise
 
+    async def refresh(self):
+        """Refresh the connection pool once no flush is in progress."""
+        async with self._pending_lock:
+            await asyncio.to_thread(self.refresh_pool)
+
     def close_pool(self):
         """Close the database connection pool."""
         if self.connection_pool:
             self.connection_pool.closeall()
             Actor.log.info("Database connection pool closed")
 
+    async def close(self):
+        """Flush pending listings, stop the periodic flush and close the pool."""
+        if self._flush_task:
+            # Let a flush in progress finish instead of cancelling it mid-write
+            self._stop_flushing.set()
+            await self._flush_task
+            self._flush_task = None
+        try:
+            await self.flush()
+        finally:
+            self.close_pool()
+
 
 # Global database manager instance
 db_manager = DatabaseManager()
@@ -10,15 +10,21 @@ from __future__ import annotations
 
 import os
 import asyncio
+import random
 import re
 import sys
-from typing import Any, Dict, List, Optional
+import threading
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple, TypeVar
 from urllib.parse import urljoin, urlparse
-from datetime import datetime
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
 
+import aiohttp
+from aiolimiter import AsyncLimiter
 from apify import Actor
-from bs4 import BeautifulSoup
-from httpx import AsyncClient, HTTPStatusError
+from lxml import etree
+from lxml.html import HtmlElement, HTMLParser
 
 # Import our database manager - handle different import paths
 try:
@@ -57,13 +63,269 @@ CATEGORY_DOMAINS = {
     "ostatni": "ostatni.bazos.cz"
 }
 
+_VALID_CATEGORIES = frozenset(CATEGORY_DOMAINS)
+# Canonical string object per category, shared by every listing dict of that category
+_CATEGORY_NAMES = {category: sys.intern(category) for category in CATEGORY_DOMAINS}
+
+# Regular expressions used on every listing or page, compiled once at import
+_RE_LISTING_ID = re.compile(r'/inzerat/(\d+)/')
+_RE_DATE = re.compile(r'\[([^\]]+)\]')
+_RE_COORDINATES = re.compile(r'place/([0-9.-]+),([0-9.-]+)')
+_RE_TOTAL_LISTINGS = re.compile(r'Zobrazeno \d+-\d+ inzerátů z (\d+)')
+_RE_PAGE_OFFSET = re.compile(r'/(\d+)/')
+
+
+# Fields filled in from the listing detail page, in output order
+_DETAIL_FIELDS = ('full_description', 'contact_name', 'phone', 'coordinates', 'images', 'similar_listings')
+
+
+@dataclass(slots=True)
+class Listing:
+    """A scraped listing; detail fields stay None until the detail page is scraped."""
+
+    id: str
+    title: str
+    url: str
+    category: str
+    price: Optional[int]
+    price_text: str
+    description: str
+    location: str
+    views: int
+    date: str
+    is_top: bool
+    image_url: Optional[str]
+    scraped_at: str
+    full_description: Optional[str] = None
+    contact_name: Optional[str] = None
+    phone: Optional[str] = None
+    coordinates: Optional[Dict[str, float]] = None
+    images: Optional[List[str]] = None
+    similar_listings: Optional[List[Dict[str, Any]]] = None
+
+    def as_dict(self) -> Dict[str, Any]:
+        """Return the dataset/database row, leaving out detail fields that were not scraped."""
+        row = {
+            'id': self.id,
+            'title': self.title,
+            'url': self.url,
+            'category': self.category,
+            'price': self.price,
+            'price_text': self.price_text,
+            'description': self.description,
+            'location': self.location,
+            'views': self.views,
+            'date': self.date,
+            'is_top': self.is_top,
+            'image_url': self.image_url,
+            'scraped_at': self.scraped_at
+        }
+        for name in _DETAIL_FIELDS:
+            value = getattr(self, name)
+            if value is not None:
+                row[name] = value
+        return row
+
+
+class _DigitRunTable(dict):
+    """``str.translate`` table that keeps ASCII digits, drops whitespace and turns
+    any other character into a space, so ``split()`` yields the digit runs.
+
+    Entries are filled in on first use, so each distinct character costs a
+    Python-level lookup only once.
+    """
+
+    def __missing__(self, codepoint: int) -> Optional[int]:
+        char = chr(codepoint)
+        if '0' <= char <= '9':
+            value = codepoint
+        elif char.isspace():
+            value = None
+        else:
+            value = 32
+        self[codepoint] = value
+        return value
+
+
+_DIGIT_RUNS = _DigitRunTable()
+
+
+def _class_is(name: str) -> str:
+    """XPath predicate matching a class attribute equal to ``name`` (BeautifulSoup ``class_`` with spaces)."""
+    return f"normalize-space(@class)='{name}'"
+
+
+def _has_class(name: str) -> str:
+    """XPath predicate matching elements carrying the CSS class ``name``."""
+    return f"contains(concat(' ', normalize-space(@class), ' '), ' {name} ')"
+
+
+def _first_text(name: str) -> etree.XPath:
+    """Compile an XPath returning the text nodes of the first ``div`` with class ``name``."""
+    return etree.XPath(f"(.//div[{_has_class(name)}])[1]//text()", smart_strings=False)
+
+
+# XPath expressions are compiled once at import; each call runs the tree walk in C
+_XP_TITLE_A = etree.XPath(f"((.//h2[{_has_class('nadpis')}])[1]//a)[1]")
+_XP_IMAGE_SRC = etree.XPath(
+    f"(((.//div[{_has_class('inzeratynadpis')}])[1]//img[{_has_class('obrazek')}])[1])/@src",
+    smart_strings=False,
+)
+_XP_DESCRIPTION = _first_text('popis')
+_XP_PRICE = _first_text('inzeratycena')
+_XP_LOCATION = _first_text('inzeratylok')
+_XP_VIEWS = _first_text('inzeratyview')
+_XP_DATE = etree.XPath(f"(.//span[{_has_class('velikost10')}])[1]//text()", smart_strings=False)
+_XP_TEXT = etree.XPath(".//text()", smart_strings=False)
+
+# Listing page blocks located by _scan_list_page(), matched on the normalized class attribute
+_LIST_CONTAINER_CLASS = 'inzeraty inzeratyflex'
+_LIST_SUMMARY_CLASS = 'listainzerat inzeratyflex'
+_PAGINATION_CLASS = 'strankovani'
+_XP_NEXT_HREF = etree.XPath(
+    "(.//a[contains(., 'Další') or contains(., 'Next')])[1]/@href", smart_strings=False
+)
+_XP_HREFS = etree.XPath(".//a/@href", smart_strings=False)
+_XP_STRING = etree.XPath("string()")
+
+# Detail page sections located by _scan_detail_blocks(), keyed by CSS class
+_DETAIL_BLOCK_CLASSES = ('popisdetail', 'carousel', 'podobne')
+_XP_MAPS_HREF = etree.XPath(
+    "(.//a[contains(@href, 'google.com/maps')])[1]/@href", smart_strings=False
+)
+_XP_CAROUSEL_IMAGES = etree.XPath(f".//img[{_has_class('carousel-cell-image')}]")
+_XP_SIMILAR_LINKS = etree.XPath(f".//div[{_class_is('inzeraty inzeratyflex')}]/descendant::a[1]")
+
+T = TypeVar('T')
+
+# Responses worth retrying: rate limiting and transient server-side failures
+_RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+_MAX_RETRY_DELAY = 60.0
+
+
+def _retry_after_seconds(value: Optional[str]) -> Optional[float]:
+    """Parse a Retry-After header given either as seconds or as an HTTP date."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+
+
+# Dataset rows are buffered across categories and pushed in batches of this size
+_DATASET_BATCH_SIZE = 1000
+
+# Listing pages are streamed into the parser in chunks of this many bytes
+_STREAM_CHUNK_SIZE = 16 * 1024
+
+# lxml parsers must not be shared between threads, so each thread caches its own
+_HTML_PARSERS = threading.local()
+
+
+def _parse_html(content: bytes, encoding: Optional[str] = None) -> HtmlElement:
+    """Parse an HTML document with a parser cached per thread and declared encoding."""
+    parsers: Optional[Dict[Optional[str], HTMLParser]] = getattr(_HTML_PARSERS, 'parsers', None)
+    if parsers is None:
+        parsers = _HTML_PARSERS.parsers = {}
+    parser = parsers.get(encoding)
+    if parser is None:
+        parser = parsers[encoding] = HTMLParser(encoding=encoding)
+    root = etree.fromstring(content, parser)
+    # An empty response body parses to None; give callers an empty document instead
+    return root if root is not None else parser.makeelement('html')
+
+
+def _fast_urljoin(base_url: str, url: Optional[str]) -> str:
+    """``urljoin`` specialised for an origin-only base such as ``https://auto.bazos.cz``.
+
+    Absolute, protocol-relative and path URLs are joined by string operations;
+    anything unusual (query, fragment or dot segments) falls back to ``urljoin``.
+    """
+    if not url:
+        return base_url
+    if url.startswith(('https://', 'http://')):
+        return url
+    if url.startswith('//') and len(url) > 2:
+        return base_url[:base_url.index(':') + 1] + url
+    if url[0] in '?#.' or url == '//':
+        return urljoin(base_url, url)
+    return base_url + '/' + url.lstrip('/')
+
+
+def _scan_list_page(doc: HtmlElement) -> Tuple[List[HtmlElement], Optional[HtmlElement], Optional[HtmlElement]]:
+    """Collect the blocks of a category listing page in one pass over the tree.
+
+    Returns the listing containers in document order together with the first
+    "Zobrazeno X-Y inzerátů z Z" summary and pagination divs (None if absent).
+    """
+    containers: List[HtmlElement] = []
+    summary = pagination = None
+    for div in doc.iter('div'):
+        classes = div.get('class')
+        if not classes or 'inzerat' not in classes and _PAGINATION_CLASS not in classes:
+            continue
+        normalized = ' '.join(classes.split())
+        if normalized == _LIST_CONTAINER_CLASS:
+            containers.append(div)
+        elif normalized == _LIST_SUMMARY_CLASS:
+            if summary is None:
+                summary = div
+        elif pagination is None and _PAGINATION_CLASS in normalized.split(' '):
+            pagination = div
+    return containers, summary, pagination
+
+
+def _scan_detail_blocks(doc: HtmlElement) -> Dict[str, HtmlElement]:
+    """Find the first element of each detail page section in one pass over the tree.
+
+    Keys are the ``_DETAIL_BLOCK_CLASSES`` names plus ``'table'`` for the contact
+    table; sections missing from the page are simply absent. lxml filters the
+    walk to ``div``/``table`` elements in C, which is cheaper than one XPath
+    search per section.
+    """
+    blocks: Dict[str, HtmlElement] = {}
+    for element in doc.iter('div', 'table'):
+        if element.tag == 'table':
+            if 'table' not in blocks and element.get('width') == '100%':
+                blocks['table'] = element
+        else:
+            classes = element.get('class')
+            if not classes:
+                continue
+            for name in _DETAIL_BLOCK_CLASSES:
+                if name in classes and name not in blocks and name in classes.split():
+                    blocks[name] = element
+        if len(blocks) == len(_DETAIL_BLOCK_CLASSES) + 1:
+            break
+    return blocks
+
+
+def _joined_text(texts: List[str]) -> str:
+    """Join text nodes with each stripped, like BeautifulSoup's ``get_text(strip=True)``."""
+    return ''.join([text.strip() for text in texts])
+
 
 class BazosScraper:
     """Main scraper class for Bazos.cz listings with enhanced pagination."""
     
-    def __init__(self, client: AsyncClient):
+    def __init__(self, client: aiohttp.ClientSession, max_requests_per_second: float = 5):
         self.client = client
-        self.scraped_listings = set()
+        # Token bucket shared by every request of the run; no limit when the rate is 0
+        self._limiter: Optional[AsyncLimiter] = None
+        if max_requests_per_second > 0:
+            self._limiter = AsyncLimiter(max_requests_per_second, 1)
+        # Listing ids seen so far, stored as ints (ids are decimal) to keep the set small
+        self.scraped_listings: set = set()
+        # Total listing count of the category being scraped, when the page reports it
+        self._category_total: Optional[int] = None
         
     async def scrape_category_listings(
         self, 
@@ -72,10 +334,18 @@ class BazosScraper:
         search_query: Optional[str] = None,
         location: Optional[str] = None,
         price_min: Optional[int] = None,
-        price_max: Optional[int] = None
-    ) -> List[Dict[str, Any]]:
-        """Scrape listings from a specific category with full pagination support."""
+        price_max: Optional[int] = None,
+        page_concurrency: int = 8
+    ) -> List[Listing]:
+        """Scrape listings from a specific category with full pagination support.
+
+        When the first page reports the total listing count, the remaining
+        offsets are known up front and are fetched ``page_concurrency`` pages at
+        a time; otherwise pages are followed one by one.
+        """
         
+        category = _CATEGORY_NAMES.get(category, category)
+        self._category_total = None
         domain = CATEGORY_DOMAINS.get(category, "www.bazos.cz")
         base_url = f"https://{domain}"
         
@@ -95,12 +365,10 @@ class BazosScraper:
             Actor.log.info(f"Scraping page {page_number} (offset {page_offset}): {url}")
             
             try:
-                response = await self.client.get(url, follow_redirects=True)
-                response.raise_for_status()
-                soup = BeautifulSoup(response.content, 'lxml')
+                doc = await self._fetch_page(url)
                 
-                # Extract listings from current page
-                page_listings = self._extract_listings_from_page(soup, category, base_url)
+                # Extract listings and pagination state from current page
+                page_listings, has_next, next_offset = self._parse_list_page(doc, category, base_url, page_offset)
                 
                 if not page_listings:
                     Actor.log.info(f"No more listings found for category {category} on page {page_number}")
@@ -116,9 +384,19 @@ class BazosScraper:
                     listings = listings[:max_listings]
                     Actor.log.info(f"Reached maximum listings limit ({max_listings}) after {total_pages_scraped} pages")
                     break
+                
+                # Offsets are predictable once the total is known, so fetch the rest in parallel
+                if page_offset == 0 and self._category_total is not None and page_concurrency > 1:
+                    total_pages_scraped += await self._scrape_remaining_pages(
+                        category, base_url, self._category_total, listings, max_listings, page_concurrency,
+                        lambda offset: self._build_search_url(
+                            base_url, offset, search_query, location, price_min, price_max
+                        )
+                    )
+                    if max_listings > 0:
+                        listings = listings[:max_listings]
+                    break
                     
-                # Check if there's a next page using multiple methods
-                has_next, next_offset = self._check_next_page(soup, page_offset)
                 if not has_next:
                     Actor.log.info(f"No next page found after page {page_number}")
                     break
@@ -126,10 +404,7 @@ class BazosScraper:
                 page_offset = next_offset
                 page_number += 1
                 
-                # Rate limiting between pages
-                await asyncio.sleep(1)
-                
-            except HTTPStatusError as e:
+            except aiohttp.ClientResponseError as e:
                 Actor.log.error(f"HTTP error while scraping {url}: {e}")
                 break
             except Exception as e:
@@ -139,6 +414,125 @@ class BazosScraper:
         Actor.log.info(f"Scraped {len(listings)} listings from category {category} across {total_pages_scraped} pages")
         return listings
     
+    async def _get(self, url: str, consume: Callable[[aiohttp.ClientResponse], Awaitable[T]]) -> T:
+        """Issue one rate-limited GET and hand the successful response to ``consume``."""
+        if self._limiter:
+            await self._limiter.acquire()
+        async with self.client.get(url) as response:
+            response.raise_for_status()
+            return await consume(response)
+    
+    async def _request(
+        self,
+        url: str,
+        consume: Callable[[aiohttp.ClientResponse], Awaitable[T]],
+        attempts: int = 3
+    ) -> T:
+        """GET ``url`` and hand the response to ``consume``, retrying transient failures.
+
+        Connection errors, timeouts, 429 and 5xx responses are retried with
+        jittered exponential backoff, honouring Retry-After on 429. Other HTTP
+        errors such as 404 are raised immediately.
+        """
+        for attempt in range(1, attempts):
+            try:
+                return await self._get(url, consume)
+            except aiohttp.ClientResponseError as e:
+                if e.status not in _RETRY_STATUSES:
+                    raise
+                error = f"HTTP {e.status}"
+                delay = _retry_after_seconds(e.headers.get('Retry-After')) if e.status == 429 and e.headers else None
+            except (aiohttp.ClientConnectionError, aiohttp.ClientPayloadError, asyncio.TimeoutError) as e:
+                error = str(e) or type(e).__name__
+                delay = None
+            
+            if delay is None:
+                delay = 2 ** (attempt - 1) + random.random()
+            delay = min(delay, _MAX_RETRY_DELAY)
+            Actor.log.warning(f"Request to {url} failed ({error}), retrying in {delay:.1f}s (attempt {attempt}/{attempts})")
+            await asyncio.sleep(delay)
+        
+        # Final attempt: any failure propagates to the caller
+        return await self._get(url, consume)
+    
+    async def _fetch_page(self, url: str) -> HtmlElement:
+        """Fetch a page and parse it incrementally as the body arrives.
+
+        Chunks are fed straight into a parser owned by this request, so the raw
+        body is never held in memory in full alongside the tree.
+        """
+        async def _stream(response: aiohttp.ClientResponse) -> HTMLParser:
+            parser = HTMLParser(encoding=response.charset)
+            async for chunk in response.content.iter_chunked(_STREAM_CHUNK_SIZE):
+                parser.feed(chunk)
+            return parser
+        
+        parser = await self._request(url, _stream)
+        try:
+            return parser.close()
+        except etree.XMLSyntaxError:
+            # Nothing was fed: the response body was empty
+            return parser.makeelement('html')
+    
+    async def _fetch_body(self, url: str) -> Tuple[bytes, Optional[str]]:
+        """Fetch a page and return its raw body with the declared charset."""
+        async def _read(response: aiohttp.ClientResponse) -> Tuple[bytes, Optional[str]]:
+            return await response.read(), response.charset
+        
+        return await self._request(url, _read)
+    
+    async def _scrape_remaining_pages(
+        self,
+        category: str,
+        base_url: str,
+        total_listings: int,
+        listings: List[Listing],
+        max_listings: int,
+        concurrency: int,
+        url_for_offset: Callable[[int], str]
+    ) -> int:
+        """Fetch the pages after the first one in windows of concurrent requests.
+
+        New listings are appended to ``listings`` in page order. Stops at the
+        first page without new listings or once ``max_listings`` is reached, and
+        returns the number of pages that yielded listings.
+        """
+        pages_scraped = 0
+        offsets = list(range(20, total_listings, 20))
+        
+        Actor.log.info(f"Category {category} has {total_listings} listings, fetching up to {concurrency} pages at a time")
+        
+        while offsets:
+            window_size = concurrency
+            if max_listings > 0:
+                # Don't request pages that cannot be needed for the remaining quota
+                window_size = min(window_size, -(-(max_listings - len(listings)) // 20))
+            window, offsets = offsets[:window_size], offsets[window_size:]
+            urls = [url_for_offset(offset) for offset in window]
+            
+            Actor.log.info(f"Scraping pages {window[0] // 20 + 1}-{window[-1] // 20 + 1} (offsets {window[0]}-{window[-1]})")
+            docs = await asyncio.gather(*[self._fetch_page(url) for url in urls], return_exceptions=True)
+            
+            for offset, url, doc in zip(window, urls, docs):
+                if isinstance(doc, BaseException):
+                    Actor.log.error(f"Error while scraping {url}: {doc}")
+                    continue
+                
+                page_listings, _, _ = self._parse_list_page(doc, category, base_url, offset)
+                if not page_listings:
+                    Actor.log.info(f"No more listings found for category {category} on page {offset // 20 + 1}")
+                    return pages_scraped
+                
+                listings.extend(page_listings)
+                pages_scraped += 1
+                Actor.log.info(f"Extracted {len(page_listings)} listings from page {offset // 20 + 1} (total so far: {len(listings)})")
+                
+                if max_listings > 0 and len(listings) >= max_listings:
+                    Actor.log.info(f"Reached maximum listings limit ({max_listings}) after {pages_scraped + 1} pages")
+                    return pages_scraped
+        
+        return pages_scraped
+    
     def _build_search_url(
         self,
         base_url: str,
@@ -171,176 +565,243 @@ class BazosScraper:
             
         return url
     
-    def _extract_listings_from_page(self, soup: BeautifulSoup, category: str, base_url: str) -> List[Dict[str, Any]]:
-        """Extract listing data from a page."""
+    def _parse_list_page(
+        self,
+        doc: HtmlElement,
+        category: str,
+        base_url: str,
+        page_offset: int
+    ) -> Tuple[List[Listing], bool, int]:
+        """Extract new listings and the next page offset from a listing page.
+
+        The page is walked once; listings, the total count and pagination are
+        then read from the blocks found. The category total is recorded from the
+        first page (offset 0).
+        """
+        containers, summary, pagination = _scan_list_page(doc)
+        listings = self._extract_listings_from_page(containers, category, base_url)
+        
+        if page_offset == 0:
+            self._category_total = self._extract_total_listings(summary)
+        
+        has_next, next_offset = self._check_next_page(pagination, summary, page_offset, len(containers))
+        return listings, has_next, next_offset
+    
+    def _extract_listings_from_page(
+        self,
+        listing_containers: List[HtmlElement],
+        category: str,
+        base_url: str
+    ) -> List[Listing]:
+        """Extract the listings not seen before from a page's listing containers."""
         
         listings = []
-        listing_containers = soup.find_all('div', class_='inzeraty inzeratyflex')
+        # One timestamp shared by every listing on the page
+        scraped_at = datetime.now(timezone.utc).isoformat()
         
         for container in listing_containers:
             try:
-                listing = self._extract_listing_data(container, category, base_url)
-                if listing and listing['id'] not in self.scraped_listings:
+                listing = self._extract_listing_data(container, category, base_url, scraped_at)
+                if not listing:
+                    continue
+                listing_key = int(listing.id) if listing.id else listing.id
+                if listing_key not in self.scraped_listings:
                     listings.append(listing)
-                    self.scraped_listings.add(listing['id'])
+                    self.scraped_listings.add(listing_key)
             except Exception as e:
                 Actor.log.warning(f"Error extracting listing: {e}")
                 continue
                 
         return listings
     
-    def _extract_listing_data(self, container: BeautifulSoup, category: str, base_url: str) -> Optional[Dict[str, Any]]:
+    def _extract_listing_data(
+        self,
+        container: HtmlElement,
+        category: str,
+        base_url: str,
+        scraped_at: str
+    ) -> Optional[Listing]:
         """Extract data from a single listing container."""
         
         # Title and URL
-        title_link = container.find('h2', class_='nadpis')
-        if not title_link:
-            return None
-            
-        title_a = title_link.find('a')
+        title_a = _XP_TITLE_A(container)
         if not title_a:
             return None
+        title_a = title_a[0]
             
-        title = title_a.get_text(strip=True)
+        title = _joined_text(_XP_TEXT(title_a))
         relative_url = title_a.get('href')
-        url = urljoin(base_url, relative_url)
+        url = _fast_urljoin(base_url, relative_url)
         
         # Extract listing ID from URL
         listing_id = self._extract_listing_id(url)
         
         # Image
-        image_container = container.find('div', class_='inzeratynadpis')
         image_url = None
-        if image_container:
-            img = image_container.find('img', class_='obrazek')
-            if img:
-                image_url = img.get('src')
-                if image_url and not image_url.startswith('http'):
-                    image_url = urljoin(base_url, image_url)
+        image_src = _XP_IMAGE_SRC(container)
+        if image_src:
+            image_url = image_src[0]
+            if image_url and not image_url.startswith('http'):
+                image_url = _fast_urljoin(base_url, image_url)
         
         # Description
-        description_div = container.find('div', class_='popis')
-        description = description_div.get_text(strip=True) if description_div else ""
+        description = _joined_text(_XP_DESCRIPTION(container))
         
         # Price
-        price_div = container.find('div', class_='inzeratycena')
-        price_text = price_div.get_text(strip=True) if price_div else ""
+        price_text = _joined_text(_XP_PRICE(container))
         price = self._extract_price(price_text)
         
         # Location
-        location_div = container.find('div', class_='inzeratylok')
-        location = location_div.get_text(strip=True) if location_div else ""
+        location = _joined_text(_XP_LOCATION(container))
         
         # Views
-        views_div = container.find('div', class_='inzeratyview')
-        views_text = views_div.get_text(strip=True) if views_div else ""
+        views_text = _joined_text(_XP_VIEWS(container))
         views = self._extract_views(views_text)
         
         # Date/TOP status
-        date_span = container.find('span', class_='velikost10')
-        date_info = date_span.get_text(strip=True) if date_span else ""
+        date_info = _joined_text(_XP_DATE(container))
         is_top = 'TOP' in date_info
         date = self._extract_date(date_info)
         
-        return {
-            'id': listing_id,
-            'title': title,
-            'url': url,
-            'category': category,
-            'price': price,
-            'price_text': price_text,
-            'description': description,
-            'location': location,
-            'views': views,
-            'date': date,
-            'is_top': is_top,
-            'image_url': image_url,
-            'scraped_at': datetime.now().isoformat()
-        }
+        return Listing(
+            id=listing_id,
+            title=title,
+            url=url,
+            category=category,
+            price=price,
+            price_text=price_text,
+            description=description,
+            location=location,
+            views=views,
+            date=date,
+            is_top=is_top,
+            image_url=image_url,
+            scraped_at=scraped_at
+        )
     
-    async def scrape_detailed_data(self, listing: Dict[str, Any]) -> Dict[str, Any]:
+    async def scrape_detailed_data(self, listing: Listing) -> Listing:
         """Scrape detailed data from individual listing page."""
         
         try:
-            response = await self.client.get(listing['url'], follow_redirects=True)
-            response.raise_for_status()
-            soup = BeautifulSoup(response.content, 'lxml')
+            body, charset = await self._fetch_body(listing.url)
             
-            # Extract additional details
-            details = self._extract_detailed_data(soup)
+            # Parse and extract in a worker thread so other requests keep flowing
+            details = await asyncio.to_thread(self._parse_detailed_data, body, charset)
+            del body
             
             # Merge with existing listing data
-            detailed_listing = {**listing, **details}
+            for name, value in details.items():
+                setattr(listing, name, value)
             
-            Actor.log.debug(f"Scraped detailed data for listing {listing['id']}")
-            return detailed_listing
+            Actor.log.debug(f"Scraped detailed data for listing {listing.id}")
+            return listing
             
         except Exception as e:
-            Actor.log.warning(f"Error scraping detailed data for {listing['url']}: {e}")
+            Actor.log.warning(f"Error scraping detailed data for {listing.url}: {e}")
             return listing
     
-    def _extract_detailed_data(self, soup: BeautifulSoup) -> Dict[str, Any]:
+    async def scrape_detailed_listings(
+        self,
+        listings: List[Listing],
+        concurrency: int = 10
+    ) -> List[Listing]:
+        """Scrape detail pages for listings with at most ``concurrency`` requests in flight.
+
+        Results keep the order of ``listings``; a listing whose detail page fails
+        is returned unchanged.
+        """
+        semaphore = asyncio.Semaphore(max(1, concurrency))
+        completed = 0
+        
+        async def _bounded(listing: Listing) -> Listing:
+            nonlocal completed
+            async with semaphore:
+                detailed_listing = await self.scrape_detailed_data(listing)
+            completed += 1
+            # Progress update
+            if completed % 10 == 0:
+                Actor.log.info(f"Scraped detailed data for {completed}/{len(listings)} listings")
+            return detailed_listing
+        
+        results = await asyncio.gather(*[_bounded(listing) for listing in listings], return_exceptions=True)
+        return [
+            listing if isinstance(result, BaseException) else result
+            for listing, result in zip(listings, results)
+        ]
+    
+    def _parse_detailed_data(self, body: bytes, charset: Optional[str]) -> Dict[str, Any]:
+        """Parse a detail page body and extract its details (runs off the event loop)."""
+        return self._extract_detailed_data(_parse_html(body, charset))
+    
+    def _extract_detailed_data(self, doc: HtmlElement) -> Dict[str, Any]:
         """Extract detailed information from listing page."""
         
         details = {}
         
+        # Locate all sections up front; extraction below skips the ones that are absent
+        blocks = _scan_detail_blocks(doc)
+        
         # Full description
-        desc_div = soup.find('div', class_='popisdetail')
-        if desc_div:
-            details['full_description'] = desc_div.get_text(strip=True)
+        desc_div = blocks.get('popisdetail')
+        if desc_div is not None:
+            details['full_description'] = _joined_text(_XP_TEXT(desc_div))
         
         # Contact information
-        contact_table = soup.find('table', width="100%")
-        if contact_table:
+        contact_table = blocks.get('table')
+        if contact_table is not None:
+            # Map row labels ("Jméno", "Telefon", ...) to their value cells in one pass,
+            # pairing cells within each two-column row so layout rows can't shift them
+            labels: Dict[str, HtmlElement] = {}
+            for row in contact_table.iter('tr'):
+                cells = row.findall('td')
+                if len(cells) == 2:
+                    labels.setdefault(_joined_text(_XP_TEXT(cells[0])).rstrip(':'), cells[1])
+            
             # Extract contact name
-            name_cell = contact_table.find('td', string=re.compile(r'Jméno:'))
-            if name_cell and name_cell.find_next_sibling('td'):
-                contact_name = name_cell.find_next_sibling('td').get_text(strip=True)
-                details['contact_name'] = contact_name
+            name_cell = labels.get('Jméno')
+            if name_cell is not None:
+                details['contact_name'] = _joined_text(_XP_TEXT(name_cell))
             
             # Extract phone (if revealed)
-            phone_cell = contact_table.find('td', string=re.compile(r'Telefon:'))
-            if phone_cell and phone_cell.find_next_sibling('td'):
-                phone_text = phone_cell.find_next_sibling('td').get_text(strip=True)
+            phone_cell = labels.get('Telefon')
+            if phone_cell is not None:
+                phone_text = _joined_text(_XP_TEXT(phone_cell))
                 if not 'zobraz číslo' in phone_text:
                     details['phone'] = phone_text
             
             # Extract exact location coordinates if available
-            location_link = contact_table.find('a', href=re.compile(r'google\.com/maps'))
-            if location_link:
-                href = location_link.get('href')
-                coords = self._extract_coordinates(href)
+            maps_href = _XP_MAPS_HREF(contact_table)
+            if maps_href:
+                coords = self._extract_coordinates(maps_href[0])
                 if coords:
                     details['coordinates'] = coords
         
         # All images
-        carousel = soup.find('div', class_='carousel')
-        if carousel:
+        carousel = blocks.get('carousel')
+        if carousel is not None:
             images = []
-            for img in carousel.find_all('img', class_='carousel-cell-image'):
+            for img in _XP_CAROUSEL_IMAGES(carousel):
                 img_url = img.get('data-flickity-lazyload') or img.get('src')
                 if img_url:
                     images.append(img_url)
             details['images'] = images
         
         # Similar/related listings
-        similar_section = soup.find('div', class_='podobne')
-        if similar_section:
-            similar_listings = []
-            for listing_div in similar_section.find_all('div', class_='inzeraty inzeratyflex'):
-                similar_title_link = listing_div.find('a')
-                if similar_title_link:
-                    similar_listings.append({
-                        'title': similar_title_link.get_text(strip=True),
-                        'url': similar_title_link.get('href')
-                    })
-            details['similar_listings'] = similar_listings
+        similar_section = blocks.get('podobne')
+        if similar_section is not None:
+            details['similar_listings'] = [
+                {
+                    'title': _joined_text(_XP_TEXT(similar_title_link)),
+                    'url': similar_title_link.get('href')
+                }
+                for similar_title_link in _XP_SIMILAR_LINKS(similar_section)
+            ]
         
         return details
     
     def _extract_listing_id(self, url: str) -> str:
         """Extract listing ID from URL."""
-        match = re.search(r'/inzerat/(\d+)/', url)
+        match = _RE_LISTING_ID.search(url)
         return match.group(1) if match else ""
     
     def _extract_price(self, price_text: str) -> Optional[int]:
@@ -348,29 +809,24 @@ class BazosScraper:
         if not price_text:
             return None
         
-        # Remove common Czech price indicators and extract numbers
-        price_match = re.search(r'([\d\s]+)', price_text.replace(' ', ''))
-        if price_match:
-            try:
-                return int(price_match.group(1).replace(' ', ''))
-            except ValueError:
-                pass
-        return None
+        # Spaces are thousands separators ("37 990 Kč"); the first number is the price
+        digits = price_text.translate(_DIGIT_RUNS).split(None, 1)
+        return int(digits[0]) if digits else None
     
     def _extract_views(self, views_text: str) -> int:
         """Extract view count from views text."""
-        match = re.search(r'(\d+)', views_text)
-        return int(match.group(1)) if match else 0
+        digits = views_text.translate(_DIGIT_RUNS).split(None, 1)
+        return int(digits[0]) if digits else 0
     
     def _extract_date(self, date_info: str) -> str:
         """Extract date from date info string."""
         # Look for date pattern like [15.9. 2025]
-        date_match = re.search(r'\[([^\]]+)\]', date_info)
+        date_match = _RE_DATE.search(date_info)
         return date_match.group(1) if date_match else ""
     
     def _extract_coordinates(self, maps_url: str) -> Optional[Dict[str, float]]:
         """Extract coordinates from Google Maps URL."""
-        coord_match = re.search(r'place/([0-9.-]+),([0-9.-]+)', maps_url)
+        coord_match = _RE_COORDINATES.search(maps_url)
         if coord_match:
             return {
                 'latitude': float(coord_match.group(1)),
@@ -378,27 +834,46 @@ class BazosScraper:
             }
         return None
     
-    def _check_next_page(self, soup: BeautifulSoup, current_offset: int) -> tuple[bool, int]:
-        """Enhanced method to check for next page and return next offset."""
+    def _extract_total_listings(self, summary: Optional[HtmlElement]) -> Optional[int]:
+        """Read the total from the "Zobrazeno X-Y inzerátů z Z" summary, if present."""
+        if summary is None:
+            return None
+        match = _RE_TOTAL_LISTINGS.search(_XP_STRING(summary))
+        return int(match.group(1)) if match else None
+    
+    def _check_next_page(
+        self,
+        pagination: Optional[HtmlElement],
+        summary: Optional[HtmlElement],
+        current_offset: int,
+        container_count: int
+    ) -> tuple[bool, int]:
+        """Enhanced method to check for next page and return next offset.
+
+        Once the category total is known from the first page, the answer is plain
+        arithmetic and the page is not searched again.
+        """
+        
+        if self._category_total is not None:
+            next_offset = current_offset + 20
+            if next_offset < self._category_total:
+                return True, next_offset
+            return False, current_offset
         
         # Method 1: Check pagination section
-        pagination = soup.find('div', class_='strankovani')
-        if pagination:
+        if pagination is not None:
             # Look for "Další" (Next) link
-            next_link = pagination.find('a', string=re.compile(r'Další|Next'))
-            if next_link:
-                href = next_link.get('href', '')
+            next_href = _XP_NEXT_HREF(pagination)
+            if next_href:
                 # Extract offset from URL like "/20/" or "/40/"
-                offset_match = re.search(r'/(\d+)/', href)
+                offset_match = _RE_PAGE_OFFSET.search(next_href[0])
                 if offset_match:
                     next_offset = int(offset_match.group(1))
                     return True, next_offset
             
             # Look for numbered page links
-            page_links = pagination.find_all('a')
-            for link in page_links:
-                href = link.get('href', '')
-                offset_match = re.search(r'/(\d+)/', href)
+            for href in _XP_HREFS(pagination):
+                offset_match = _RE_PAGE_OFFSET.search(href)
                 if offset_match:
                     offset = int(offset_match.group(1))
                     if offset > current_offset:
@@ -406,26 +881,45 @@ class BazosScraper:
         
         # Method 2: Check if we have listings on current page
         # If we have 20 listings (full page), there might be more
-        listing_containers = soup.find_all('div', class_='inzeraty inzeratyflex')
-        if len(listing_containers) >= 20:  # Full page typically has 20 listings
+        if container_count >= 20:  # Full page typically has 20 listings
             next_offset = current_offset + 20
             return True, next_offset
         
         # Method 3: Check for "Zobrazeno X-Y inzerátů z Z" pattern
-        listainzerat = soup.find('div', class_='listainzerat inzeratyflex')
-        if listainzerat:
-            text = listainzerat.get_text()
-            # Look for pattern like "Zobrazeno 1-20 inzerátů z 421474"
-            match = re.search(r'Zobrazeno \d+-\d+ inzerátů z (\d+)', text)
-            if match:
-                total_listings = int(match.group(1))
-                current_end = current_offset + 20
-                if current_end < total_listings:
-                    return True, current_offset + 20
+        total_listings = self._extract_total_listings(summary)
+        if total_listings is not None:
+            self._category_total = total_listings
+            current_end = current_offset + 20
+            if current_end < total_listings:
+                return True, current_offset + 20
         
         return False, current_offset
 
 
+async def save_listings_to_database(listings: List[Dict[str, Any]], category: str) -> bool:
+    """Hand listings to the database writer, refreshing the pool and retrying once on failure.
+
+    Returns whether the listings were accepted.
+    """
+    try:
+        Actor.log.debug("Inserting listings to database...")
+        await db_manager.insert_listings(listings)
+        Actor.log.info(f"Queued {len(listings)} listings for database from category {category}")
+        return True
+    except Exception as e:
+        Actor.log.error(f"Failed to save listings to database: {e}")
+        # Failed rows stay buffered; refresh the connection pool and flush them once more
+        try:
+            Actor.log.info("Attempting to refresh connection pool and retry database operation")
+            await db_manager.refresh()
+            await db_manager.flush()
+            Actor.log.info(f"Successfully saved {len(listings)} listings to database after retry")
+            return True
+        except Exception as retry_e:
+            Actor.log.error(f"Failed to save listings to database even after retry: {retry_e}")
+            return False
+
+
 async def main() -> None:
     """Main entry point for the Bazos.cz scraper with enhanced pagination and database integration."""
     
@@ -441,6 +935,9 @@ async def main() -> None:
         
         max_listings = actor_input.get('maxListings', 100)
         include_detailed_data = actor_input.get('includeDetailedData', True)
+        detail_concurrency = actor_input.get('detailConcurrency', 10)
+        page_concurrency = actor_input.get('pageConcurrency', 8)
+        max_requests_per_second = actor_input.get('maxRequestsPerSecond', 5)
         search_query = actor_input.get('searchQuery')
         location = actor_input.get('location')
         price_min = actor_input.get('priceMin')
@@ -455,6 +952,9 @@ async def main() -> None:
         Actor.log.info(f"Starting Bazos.cz scraper with categories: {categories}")
         Actor.log.info(f"Max listings per category: {max_listings} (0 = unlimited)")
         Actor.log.info(f"Include detailed data: {include_detailed_data}")
+        if include_detailed_data:
+            Actor.log.info(f"Detail page concurrency: {detail_concurrency}")
+        Actor.log.info(f"Max requests per second: {max_requests_per_second or 'unlimited'}")
         Actor.log.info(f"Actor Run ID: {actor_run_id}")
         if search_query:
             Actor.log.info(f"Search query: {search_query}")
@@ -500,104 +1000,143 @@ async def main() -> None:
             'Upgrade-Insecure-Requests': '1'
         }
         
-        async with AsyncClient(headers=headers, timeout=30.0) as client:
-            scraper = BazosScraper(client)
+        dataset_buffer: List[Dict[str, Any]] = []
+        
+        async def push_dataset_buffer() -> None:
+            """Push buffered rows to the Apify dataset in a single call.
+
+            The buffer is only cleared once the push succeeds, so a failed push
+            is retried with the next one instead of dropping the rows.
+            """
+            nonlocal dataset_buffer
+            if dataset_buffer:
+                await Actor.push_data(dataset_buffer)
+                Actor.log.info(f"Saved {len(dataset_buffer)} listings to Apify dataset")
+                dataset_buffer = []
+        
+        try:
+            # Size the pool to the request concurrency so parallel fetches reuse
+            # kept-alive connections instead of opening new TLS sessions
+            connection_limit = max(page_concurrency, detail_concurrency, 1)
+            connector = aiohttp.TCPConnector(
+                limit=connection_limit,
+                limit_per_host=connection_limit,
+                ttl_dns_cache=300,
+                keepalive_timeout=30
+            )
+            async with aiohttp.ClientSession(
+                headers=headers,
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(total=30)
+            ) as client:
+                scraper = BazosScraper(client, max_requests_per_second=max_requests_per_second)
             
-            all_listings = []
-            total_pages_scraped = 0
+                all_listings = []
+                total_pages_scraped = 0
+                pending_insert: Optional[asyncio.Task] = None
             
-            # Scrape each category
-            for category_index, category in enumerate(categories):
-                if category not in CATEGORY_DOMAINS:
-                    Actor.log.warning(f"Unknown category: {category}, skipping")
-                    continue
+                # Scrape each category
+                for category_index, category in enumerate(categories):
+                    if category not in _VALID_CATEGORIES:
+                        Actor.log.warning(f"Unknown category: {category}, skipping")
+                        continue
                 
-                try:
-                    Actor.log.info(f"=== Starting category: {category} ===")
+                    try:
+                        Actor.log.info(f"=== Starting category: {category} ===")
                     
-                    # Refresh database connection pool every few categories for long runs
-                    if db_manager_available and category_index > 0 and category_index % 3 == 0:
-                        try:
-                            Actor.log.info("Refreshing database connection pool for long-running operation")
-                            db_manager.refresh_pool()
-                        except Exception as e:
-                            Actor.log.warning(f"Failed to refresh connection pool: {e}")
+                        # Refresh database connection pool every few categories for long runs
+                        if db_manager_available and category_index > 0 and category_index % 3 == 0:
+                            try:
+                                if pending_insert:
+                                    await pending_insert
+                                    pending_insert = None
+                                Actor.log.info("Refreshing database connection pool for long-running operation")
+                                await db_manager.refresh()
+                            except Exception as e:
+                                Actor.log.warning(f"Failed to refresh connection pool: {e}")
                     
-                    category_listings = await scraper.scrape_category_listings(
-                        category=category,
-                        max_listings=max_listings,
-                        search_query=search_query,
-                        location=location,
-                        price_min=price_min,
-                        price_max=price_max
-                    )
+                        category_listings = await scraper.scrape_category_listings(
+                            category=category,
+                            max_listings=max_listings,
+                            search_query=search_query,
+                            location=location,
+                            price_min=price_min,
+                            price_max=price_max,
+                            page_concurrency=page_concurrency
+                        )
                     
-                    # Scrape detailed data if requested
-                    if include_detailed_data and category_listings:
-                        Actor.log.info(f"Scraping detailed data for {len(category_listings)} listings from {category}")
+                        # Scrape detailed data if requested
+                        if include_detailed_data and category_listings:
+                            Actor.log.info(f"Scraping detailed data for {len(category_listings)} listings from {category}")
                         
-                        detailed_listings = []
-                        for i, listing in enumerate(category_listings):
-                            detailed_listing = await scraper.scrape_detailed_data(listing)
-                            detailed_listings.append(detailed_listing)
-                            
-                            # Progress update
-                            if (i + 1) % 10 == 0:
-                                Actor.log.info(f"Scraped detailed data for {i + 1}/{len(category_listings)} listings")
-                            
-                            # Rate limiting for detailed scraping
-                            await asyncio.sleep(0.5)
-                        
-                        category_listings = detailed_listings
+                            category_listings = await scraper.scrape_detailed_listings(
+                                category_listings, concurrency=detail_concurrency
+                            )
                     
-                    all_listings.extend(category_listings)
+                        all_listings.extend(category_listings)
                     
-                    # Save data to both Apify dataset and database
-                    if category_listings:
-                        # Save to Apify dataset
-                        await Actor.push_data(category_listings)
-                        Actor.log.info(f"Saved {len(category_listings)} listings to Apify dataset from category {category}")
+                        # Save data to both Apify dataset and database
+                        if category_listings:
+                            # Listings become plain dicts only here, at the storage boundary
+                            category_rows = [listing.as_dict() for listing in category_listings]
+                            
+                            # Save to database if available; the insert runs in a worker
+                            # thread while the next category is being scraped. Queued
+                            # before the dataset push so a failed push can't skip it.
+                            if db_manager_available:
+                                if pending_insert:
+                                    await pending_insert
+                                pending_insert = asyncio.create_task(
+                                    save_listings_to_database(category_rows, category)
+                                )
                         
-                        # Save to database if available
-                        if db_manager_available:
-                            try:
-                                # Check connection health before inserting
-                                Actor.log.debug("Inserting listings to database...")
-                                db_manager.insert_listings(category_listings)
-                                Actor.log.info(f"Saved {len(category_listings)} listings to database from category {category}")
-                            except Exception as e:
-                                Actor.log.error(f"Failed to save listings to database: {e}")
-                                # Try to refresh the connection pool and retry once
-                                try:
-                                    Actor.log.info("Attempting to refresh connection pool and retry database operation")
-                                    db_manager.refresh_pool()
-                                    db_manager.insert_listings(category_listings)
-                                    Actor.log.info(f"Successfully saved {len(category_listings)} listings to database after retry")
-                                except Exception as retry_e:
-                                    Actor.log.error(f"Failed to save listings to database even after retry: {retry_e}")
+                            # Save to Apify dataset, batching small categories together
+                            dataset_buffer.extend(category_rows)
+                            if len(dataset_buffer) >= _DATASET_BATCH_SIZE:
+                                await push_dataset_buffer()
                     
-                    Actor.log.info(f"=== Completed category: {category} ===")
+                        Actor.log.info(f"=== Completed category: {category} ===")
                     
+                    except Exception as e:
+                        Actor.log.error(f"Error scraping category {category}: {e}")
+                        continue
+            
+                if pending_insert:
+                    await pending_insert
+                
+                try:
+                    await push_dataset_buffer()
                 except Exception as e:
-                    Actor.log.error(f"Error scraping category {category}: {e}")
-                    continue
+                    # Rows stay buffered and are pushed again on the way out
+                    Actor.log.error(f"Failed to push listings to Apify dataset: {e}")
+
+                # Final summary and database cleanup
+                Actor.log.info(f"=== SCRAPING COMPLETED ===")
+                Actor.log.info(f"Total listings scraped: {len(all_listings)}")
+                Actor.log.info(f"Categories processed: {len(categories)}")
             
-            # Final summary and database cleanup
-            Actor.log.info(f"=== SCRAPING COMPLETED ===")
-            Actor.log.info(f"Total listings scraped: {len(all_listings)}")
-            Actor.log.info(f"Categories processed: {len(categories)}")
+                # Write out everything still buffered and mark the run completed in the
+                # same transaction, so the run is never completed ahead of its data
+                if db_manager_available:
+                    try:
+                        await db_manager.flush(('completed', len(all_listings)))
+                    except Exception as e:
+                        Actor.log.error(f"Failed to update actor run status: {e}")
             
-            # Update actor run status in database
+                # Set status message
+                await Actor.set_status_message(f"Completed: {len(all_listings)} listings scraped from {len(categories)} categories")
+        finally:
+            # Write out whatever is still buffered, even if scraping was interrupted
+            try:
+                await push_dataset_buffer()
+            except Exception as e:
+                Actor.log.error(f"Failed to push pending listings to Apify dataset: {e}")
             if db_manager_available:
                 try:
-                    db_manager.update_actor_run_status('completed', len(all_listings))
-                    db_manager.close_pool()
+                    await db_manager.close()
                     Actor.log.info("Database connection closed successfully")
                 except Exception as e:
-                    Actor.log.error(f"Failed to update actor run status: {e}")
-            
-            # Set status message
-            await Actor.set_status_message(f"Completed: {len(all_listings)} listings scraped from {len(categories)} categories")
+                    Actor.log.error(f"Failed to write pending listings to database: {e}")
 
 
 if __name__ == '__main__':